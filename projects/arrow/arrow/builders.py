@@ -10,7 +10,8 @@ from buildbot.plugins import util
 from ursabot.builders import DockerBuilder
 from ursabot.utils import Filter, Matching, AnyOf, Has, Extend, Merge
 from ursabot.steps import (SetPropertiesFromEnv, SetPropertyFromCommand,
-                           Mkdir, GitHub, SetupPy, PyTest, Pip, CMake)
+                           Mkdir, GitHub, SetupPy, PyTest, Pip, CMake,
+                           ShellCommand)
 from .steps import (Archery, Ninja, Bundle, CTest, Meson, Maven, Go, Cargo,
                     Npm, R)
 
@@ -36,6 +37,16 @@ definitions = dict(
     CMAKE_CXX_FLAGS=None,
     CMAKE_AR=None,
     CMAKE_RANLIB=None,
+    # Wrap the compilers with ccache, the docker images ship it and the
+    # builders mount a persistent cache directory
+    CMAKE_C_COMPILER_LAUNCHER='ccache',
+    CMAKE_CXX_COMPILER_LAUNCHER='ccache',
+    CMAKE_CUDA_COMPILER_LAUNCHER=None,
+    # Compile the sources in batches sharing the header parsing, speeds up
+    # clean builds but slows down incremental ones, so keep it off for
+    # builders reusing their build directory
+    CMAKE_UNITY_BUILD='OFF',
+    CMAKE_UNITY_BUILD_BATCH_SIZE='16',
     PYTHON_EXECUTABLE=None,
     # Build Arrow with Altivec
     ARROW_ALTIVEC='ON',
@@ -165,6 +176,42 @@ definitions = dict(
 )
 definitions = {k: util.Property(k, default=v) for k, v in definitions.items()}
 
+# the build tool is derived from the generator, so switching the generator
+# requires setting a single property
+cmake_generator = util.Property('CMAKE_GENERATOR', default='Ninja')
+cmake_build_tools = {
+    'Ninja': 'ninja',
+    'Unix Makefiles': 'make'
+}
+
+
+def build_tool_for(generator):
+    try:
+        return cmake_build_tools[generator]
+    except KeyError:
+        supported = ', '.join(f'`{g}`' for g in cmake_build_tools)
+        raise ValueError(
+            f'Unsupported CMAKE_GENERATOR `{generator}`, the supported '
+            f'generators are: {supported}'
+        )
+
+
+cmake_build_tool = util.Transform(build_tool_for, cmake_generator)
+
+
+@util.renderer
+def ccache_env(props):
+    # ccache can distribute the compilations, e.g. set CCACHE_PREFIX=distcc,
+    # DISTCC_HOSTS and a matching ncpus property; unset properties are left
+    # out, because None would remove the worker's own environment variable
+    env = {}
+    for name in ('CCACHE_PREFIX', 'DISTCC_HOSTS'):
+        value = props.getProperty(name)
+        if value is not None:
+            env[name] = value
+    return env
+
+
 ld_library_path = util.Interpolate(
     '%(prop:CMAKE_INSTALL_PREFIX)s/%(prop:CMAKE_INSTALL_LIBDIR)s'
 )
@@ -182,21 +229,24 @@ cpp_mkdir = Mkdir(
 cpp_cmake = CMake(
     path='..',
     workdir='cpp/build',
-    generator='Ninja',
+    generator=cmake_generator,
     definitions=definitions
 )
-cpp_compile = Ninja(
-    j=util.Property('ncpus', 6),
+cpp_compile = ShellCommand(
+    command=cmake_build_tool,
+    args=['-j', util.Property('ncpus', 6)],
     name='Compile C++',
-    workdir='cpp/build'
+    workdir='cpp/build',
+    env=ccache_env
 )
 cpp_test = CTest(
     j=util.Property('ncpus', 6),
     output_on_failure=True,
     workdir='cpp/build'
 )
-cpp_install = Ninja(
-    'install',
+cpp_install = ShellCommand(
+    command=cmake_build_tool,
+    args=['install'],
     name='Install C++',
     workdir='cpp/build'
 )
@@ -235,7 +285,7 @@ python_install = SetupPy(
     workdir='python',
     env=dict(
         ARROW_HOME=util.Property('CMAKE_INSTALL_PREFIX'),
-        PYARROW_CMAKE_GENERATOR=util.Property('CMAKE_GENERATOR'),
+        PYARROW_CMAKE_GENERATOR=cmake_generator,
         PYARROW_BUILD_TYPE=util.Property('CMAKE_BUILD_TYPE'),
         PYARROW_WITH_S3=util.Property('ARROW_S3'),
         PYARROW_WITH_ORC=util.Property('ARROW_ORC'),
@@ -10,11 +10,12 @@ from ursabot.steps import ShellCommand, ResultLogMixin
 class Ninja(ShellCommand):
     # TODO(kszucs): add proper descriptions
     name = 'Ninja'
-    command = ['ninja']
+    command = ('ninja',)
+    _options = ('j', 'k', 'l', 'n')
 
     def __init__(self, *targets, **kwargs):
         args = []
-        for ninja_option in {'j', 'k', 'l', 'n'}:
+        for ninja_option in self._options:
             value = kwargs.pop(ninja_option, None)
             if value is not None:
                 args.extend([f'-{ninja_option}', value])
@@ -24,13 +25,14 @@ class Ninja(ShellCommand):
 
 class CTest(ShellCommand):
     name = 'CTest'
-    command = ['ctest']
+    command = ('ctest',)
+    _options = ('j', 'L', 'R', 'E')
 
     def __init__(self, output_on_failure=False, **kwargs):
         args = []
         if output_on_failure:
             args.append('--output-on-failure')
-        for ctest_option in {'j', 'L', 'R', 'E'}:
+        for ctest_option in self._options:
             value = kwargs.pop(ctest_option, None)
             if value is not None:
                 args.extend([f'-{ctest_option}', value])
@@ -39,51 +41,51 @@ class CTest(ShellCommand):
 
 class Archery(ResultLogMixin, ShellCommand):
     name = 'Archery'
-    command = ['archery']
+    command = ('archery',)
     env = dict(LC_ALL='C.UTF-8', LANG='C.UTF-8')  # required for click
 
 
 class Crossbow(ResultLogMixin, ShellCommand):
     name = 'Crossbow'
-    command = ['python', 'crossbow.py']
+    command = ('python', 'crossbow.py')
     env = dict(LC_ALL='C.UTF-8', LANG='C.UTF-8')  # required for click
 
 
 class Bundle(ShellCommand):
     name = 'Bundler'
-    command = ['bundle']
+    command = ('bundle',)
 
 
 class Maven(ShellCommand):
     name = 'Maven'
-    command = ['mvn']
+    command = ('mvn',)
 
 
 class Meson(ShellCommand):
     name = 'Meson'
-    command = ['meson']
+    command = ('meson',)
 
 
 class Npm(ShellCommand):
     name = 'NPM'
-    command = ['npm']
+    command = ('npm',)
 
 
 class Go(ShellCommand):
     name = 'Go'
-    command = ['go']
+    command = ('go',)
 
 
 class Cargo(ShellCommand):
     name = 'Cargo'
-    command = ['cargo']
+    command = ('cargo',)
 
 
 class R(ShellCommand):
     name = 'R'
-    command = ['R']
+    command = ('R',)
 
 
 class Make(ShellCommand):
     name = 'Make'
-    command = ['make']
+    command = ('make',)
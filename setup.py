@@ -46,7 +46,6 @@ setup(
         'ruamel.yaml',
         'tabulate',
         'toolz',
-        'toposort',
         'treq',
         'twisted[tls]',
         'typeguard'
@@ -50,6 +50,7 @@ class Builder(Annotable):
     next_worker: Optional[Callable] = None
     can_start_build: Optional[Callable] = None
     collapse_requests: Optional[Callable] = None
+    max_simultaneous_builds: Optional[int] = None
     worker_filter: Optional[WorkerFilter] = lambda w: True
 
     def __init__(self, **kwargs):
@@ -76,6 +77,24 @@ class Builder(Annotable):
         )
         return rendered.result
 
+    def _next_build(self):
+        if self.max_simultaneous_builds is None:
+            return self.next_build
+
+        limit, next_build = self.max_simultaneous_builds, self.next_build
+
+        def limited_next_build(builder, requests):
+            # prevent the builder from occupying all of the shared workers,
+            # returning None doesn't start a build for any of the requests
+            if len(builder.building) >= limit:
+                return None
+            elif next_build is None:
+                return requests[0]
+            else:
+                return next_build(builder, requests)
+
+        return limited_next_build
+
     def as_config(self):
         factory = BuildFactory(self.steps)
         properties = self._render_properties()
@@ -86,7 +105,7 @@ class Builder(Annotable):
             tags=self.tags, env=self.env, locks=self.locks,
             builddir=str(self.builddir),
             workerbuilddir=str(self.workerbuilddir),
-            nextWorker=self.next_worker, nextBuild=self.next_build,
+            nextWorker=self.next_worker, nextBuild=self._next_build(),
             collapseRequests=self.collapse_requests,
             canStartBuild=self.can_start_build
         )
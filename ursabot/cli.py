@@ -375,13 +375,15 @@ def docker_list_images(obj):
               help='Push the built images')
 @click.option('--no-cache/--cache', default=False,
               help='Do not use cache when building the images')
+@click.option('--parallelism', '-j', default=1, type=click.IntRange(min=1),
+              help='Number of images to build concurrently')
 @click.pass_obj
-def docker_image_build(obj, push, no_cache):
+def docker_image_build(obj, push, no_cache, parallelism):
     """Build and optionally push docker images"""
     client = obj['client']
     images = obj['images']
 
-    images.build(client=client, nocache=no_cache)
+    images.build(client=client, nocache=no_cache, parallelism=parallelism)
     if push:
         images.push(client=client)
 
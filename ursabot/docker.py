@@ -12,8 +12,8 @@ from functools import wraps
 from operator import methodcaller
 from textwrap import indent, dedent
 from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor
 
-from toposort import toposort
 from dockermap.api import DockerFile, DockerClientWrapper
 from dockermap.shortcuts import mkdir
 from dockermap.build.dockerfile import format_command
@@ -121,7 +121,7 @@ class DockerImage:
     """
 
     __slots__ = ('name', 'title', 'base', 'tag', 'org', 'platform', 'variant',
-                 'steps')
+                 'steps', '_hash')
 
     def __init__(self, name, base, title=None, org=None, tag='latest',
                  platform=None, variant=None, steps=tuple()):
@@ -173,6 +173,9 @@ class DockerImage:
         self.platform = platform
         self.variant = variant
         self.steps = tuple(steps)
+        # images are hashed many times while sorting the collections, the
+        # hash is computed once and also kept stable for the image's lifetime
+        self._hash = hash((self.name, self.tag, self.steps))
 
     def __str__(self):
         return self.fqn
@@ -181,7 +184,7 @@ class DockerImage:
         return f'<DockerImage: {self.fqn} at {id(self)}>'
 
     def __hash__(self):
-        return hash((self.name, self.tag, self.steps))
+        return self._hash
 
     @property
     def fqn(self):
@@ -267,12 +270,72 @@ class ImageCollection(list):
                     stack.append(image.base)
         return deps
 
-    def build(self, *args, **kwargs):
+    def _build_order(self):
+        """Returns the images grouped into generations in topological order
+
+        Uses Kahn's algorithm, so deep image hierarchies don't hit the
+        recursion limit. Each generation only depends on the previous ones.
+        """
         deps = self._image_dependents()
-        for image_set in toposort(deps):
-            # TODO(kszucs): this can be easily parallelized with dask
-            for image in image_set:
-                image.build(*args, **kwargs)
+        in_degree = {image: len(parents) for image, parents in deps.items()}
+        children = collections.defaultdict(list)
+        for image, parents in deps.items():
+            for parent in parents:
+                children[parent].append(image)
+
+        generation = [image for image, n in in_degree.items() if n == 0]
+        generations = []
+        while generation:
+            generations.append(generation)
+            next_generation = []
+            for image in generation:
+                for child in children[image]:
+                    in_degree[child] -= 1
+                    if in_degree[child] == 0:
+                        next_generation.append(child)
+            generation = next_generation
+
+        if sum(map(len, generations)) != len(in_degree):
+            raise ValueError('The images have circular dependencies')
+
+        return generations
+
+    def build(self, *args, parallelism=1, **kwargs):
+        """Build the images of the collection including their parents
+
+        Parameters
+        ----------
+        parallelism : int, default 1
+            Maximum number of images built concurrently. An image starts
+            building as soon as its base image is built, so independent
+            image hierarchies are built in parallel.
+        """
+        if parallelism < 1:
+            raise ValueError('`parallelism` must be a positive integer')
+
+        futures = {}
+
+        def build_image(image):
+            # the images are submitted in topological order and the pool
+            # starts them in that order, so the base image's build is either
+            # running or done, waiting for it cannot deadlock the pool
+            base = futures.get(image.base)
+            if base is not None:
+                base.result()
+            return image.build(*args, **kwargs)
+
+        with ThreadPoolExecutor(max_workers=parallelism) as executor:
+            for generation in self._build_order():
+                for image in generation:
+                    futures[image] = executor.submit(build_image, image)
+            try:
+                for future in futures.values():
+                    future.result()
+            except Exception:
+                # don't start building the queued images
+                for future in futures.values():
+                    future.cancel()
+                raise
 
     def push(self, *args, **kwargs):
         # topological sort is not required because the layers are cached
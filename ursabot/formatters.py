@@ -7,6 +7,7 @@
 import textwrap
 
 import toolz
+from twisted.internet import defer, threads
 from buildbot.util.logger import Logger
 from buildbot.reporters import utils
 from buildbot.process.results import Results, FAILURE, EXCEPTION
@@ -145,6 +146,14 @@ class Formatter:
 
 
 class MarkdownFormatter(Formatter):
+    """Renders markdown messages with the errors of the failing steps
+
+    Parameters
+    ----------
+    threaded : bool, default False
+        Extract and format the failing steps' logs in a thread to avoid
+        blocking the reactor with the processing of large logs.
+    """
 
     layout = textwrap.dedent("""
         [{builder_name} (#{build_id})]({build_url}) builder {status}.
@@ -154,37 +163,50 @@ class MarkdownFormatter(Formatter):
         {context}
     """)
 
-    async def render_failure(self, build, master):
-        template = textwrap.dedent("""
-            {step_name}: `{state_string}` step's stderr:
-            ```
-            {stderr}
-            ```
-        """).strip()
+    # per step templates, dedented once instead of on each rendering
+    _stderr_template = textwrap.dedent("""
+        {step_name}: `{state_string}` step's stderr:
+        ```
+        {stderr}
+        ```
+    """).strip()
+    _traceback_template = textwrap.dedent("""
+        {step_name}: `{state_string}` step's traceback:
+        ```pycon
+        {traceback}
+        ```
+    """).strip()
+
+    def __init__(self, *args, threaded=False, **kwargs):
+        self.threaded = threaded
+        super().__init__(*args, **kwargs)
+
+    def _defer(self, master, fn, *args):
+        # processing large logs can take a while, so optionally execute it in
+        # the master reactor's thread pool instead of blocking the reactor
+        if self.threaded:
+            reactor = master.reactor
+            return threads.deferToThreadPool(reactor, reactor.getThreadPool(),
+                                             fn, *args)
+        else:
+            return defer.succeed(fn(*args))
 
+    def _format_stderr(self, build):
         # extract stderr from logs named `stdio` from failing steps
         errors = []
         for step, log_lines in self.extract_logs(build, logname='stdio'):
             if step['results'] == FAILURE:
                 stderr = (l for stream, l in log_lines if stream == 'stderr')
                 errors.append(
-                    template.format(
+                    self._stderr_template.format(
                         step_name=step['name'],
                         state_string=step['state_string'],
                         stderr='\n'.join(stderr)
                     )
                 )
+        return '\n\n'.join(errors)
 
-        return dict(status='failed', context='\n\n'.join(errors))
-
-    async def render_exception(self, build, master):
-        template = textwrap.dedent("""
-            {step_name}: `{state_string}` step's traceback:
-            ```pycon
-            {traceback}
-            ```
-        """).strip()
-
+    def _format_traceback(self, build):
         # steps failed with an exception usually have a log named 'err.text',
         # which contains a HTML formatted stack traceback.
         errors = []
@@ -192,17 +214,22 @@ class MarkdownFormatter(Formatter):
             if step['results'] == EXCEPTION:
                 traceback = (l for _, l in log_lines)
                 errors.append(
-                    template.format(
+                    self._traceback_template.format(
                         step_name=step['name'],
                         state_string=step['state_string'],
                         traceback='\n'.join(traceback)
                     )
                 )
+        return '\n\n'.join(errors)
 
-        return dict(
-            status='failed with an exception',
-            context='\n\n'.join(errors)
-        )
+    async def render_failure(self, build, master):
+        context = await self._defer(master, self._format_stderr, build)
+        return dict(status='failed', context=context)
+
+    async def render_exception(self, build, master):
+        context = await self._defer(master, self._format_traceback,
+                                    build)
+        return dict(status='failed with an exception', context=context)
 
     async def render_started(self, build, master):
         return dict(status='is started', context='')
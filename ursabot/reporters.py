@@ -9,16 +9,16 @@
 # is not marked as such.
 
 import re
-import collections
+from functools import lru_cache
 
+from twisted.internet import defer
 from buildbot import config
 from buildbot.util.logger import Logger
 from buildbot.util.giturlparse import giturlparse
 from buildbot.reporters.http import HttpStatusPushBase
 from buildbot.interfaces import IRenderable
-from buildbot.process.properties import Properties, Interpolate, renderer
-from buildbot.process.results import (Results, CANCELLED, EXCEPTION, FAILURE,
-                                      RETRY, SKIPPED, SUCCESS, WARNINGS)
+from buildbot.process.properties import Properties, renderer
+from buildbot.process.results import Results
 
 from .utils import ensure_deferred, HTTPClientService, GithubClientService
 from .builders import Builder
@@ -39,6 +39,67 @@ log = Logger()
 # a build is started if build[complete] is False
 _statuses = frozenset(['started'] + Results)
 
+# github commit states indexed by the buildbot result codes, in order:
+# SUCCESS, WARNINGS, FAILURE, SKIPPED, EXCEPTION, RETRY, CANCELLED
+_github_states = (
+    'success', 'success', 'failure', 'success', 'error', 'pending', 'error'
+)
+
+# github review events indexed by the buildbot result codes, in the same order
+_github_review_events = (
+    'APPROVE', 'APPROVE', 'REQUEST_CHANGES', 'APPROVE', 'REQUEST_CHANGES',
+    'PENDING', 'REQUEST_CHANGES'
+)
+
+# github's magic reference of the pull requests' merge commits
+_pull_request_ref = re.compile(r'refs/pull/([0-9]*)/merge')
+
+
+@lru_cache(maxsize=256)
+def _parse_git_url(url):
+    # the same few repository urls are reported over and over again
+    return giturlparse(url)
+
+
+class _LazyProperties:
+    """Read-only view of a build's properties dictionary
+
+    Plain lookups are served from the `{name: (value, source)}` dictionary
+    received with the build, the Properties object is only materialized when
+    it is actually needed, e.g. for rendering a renderable.
+    """
+
+    __slots__ = ('_dict', '_properties')
+
+    def __init__(self, properties):
+        self._dict = properties
+        self._properties = None
+
+    def __getitem__(self, name):
+        value, _ = self._dict[name]
+        return value
+
+    def __contains__(self, name):
+        return name in self._dict
+
+    def getProperty(self, name, default=None):
+        try:
+            return self[name]
+        except KeyError:
+            return default
+
+    def _materialize(self):
+        if self._properties is None:
+            self._properties = Properties.fromDict(self._dict)
+        return self._properties
+
+    def render(self, value):
+        return self._materialize().render(value)
+
+    def __getattr__(self, name):
+        # fall back to the full Properties interface
+        return getattr(self._materialize(), name)
+
 
 class HttpStatusPush(HttpStatusPushBase):
     """Makes possible to configure whether to send reports on started builds"""
@@ -79,9 +140,16 @@ class HttpStatusPush(HttpStatusPushBase):
         for name, value in args:
             if value is None:
                 continue
-            elif not isinstance(value, collections.abc.Set):
-                config.error(f'`{name}` argument must be an instanse of set')
-            elif not value.issubset(_statuses):
+            if isinstance(value, str):
+                config.error(f'`{name}` argument must be a set of statuses, '
+                             f'not a string')
+                continue
+            try:
+                value = frozenset(value)
+            except TypeError:
+                config.error(f'`{name}` argument must be a set of statuses')
+                continue
+            if not value.issubset(_statuses):
                 invalids = value - _statuses
                 config.error(f'`{name}` contains invalid elements: {invalids}')
 
@@ -99,7 +167,13 @@ class HttpStatusPush(HttpStatusPushBase):
         await super().reconfigService(**kwargs)
         await self.reconfigClient(**kwargs)
         self.verbose = verbose
-        self.report_on = (report_on or _statuses) - (dont_report_on or set())
+        self.report_on = (
+            frozenset(report_on or _statuses) - frozenset(dont_report_on or ())
+        )
+        # flags indexed by the result codes to avoid the set lookups in
+        # filterBuilds which is called for every single build event
+        self._report_on_started = 'started' in self.report_on
+        self._report_on_results = tuple(r in self.report_on for r in Results)
 
     async def reconfigClient(self, baseURL, headers, auth, debug, verify,
                              **kwargs):
@@ -113,8 +187,11 @@ class HttpStatusPush(HttpStatusPushBase):
         )
 
     def filterBuilds(self, build):
-        status = Results[build['results']] if build['complete'] else 'started'
-        if status not in self.report_on:
+        if build['complete']:
+            report = self._report_on_results[build['results']]
+        else:
+            report = self._report_on_started
+        if not report:
             return False
         return super().filterBuilds(build)
 
@@ -135,51 +212,69 @@ class HttpStatusPush(HttpStatusPushBase):
         # So the official[quiet twisted] example wouldn't work:
         #    http://docs.buildbot.net/2.3.0/full.html#githubcommentpush
 
+        sourcestamps = build['buildset'].get('sourcestamps', [])
+        properties = _LazyProperties(build['properties'])
+
+        if len(sourcestamps) == 1:
+            # the common case, report directly without gathering
+            return await self._send_sourcestamp(build, sourcestamps[0],
+                                                properties)
+
+        # the reports of the sourcestamps are independent from each other, so
+        # submit them concurrently to overlap the http round trips
+        reports = [
+            defer.ensureDeferred(
+                self._send_sourcestamp(build, sourcestamp, properties)
+            )
+            for sourcestamp in sourcestamps
+        ]
+        try:
+            await defer.gatherResults(reports, consumeErrors=True)
+        except defer.FirstError as e:
+            e.subFailure.raiseException()
+
+    async def _send_sourcestamp(self, build, sourcestamp, properties):
         cls = self.__class__.__name__
 
         build_number = build['number']
         builder_name = build['builder']['name']
-        sourcestamps = build['buildset'].get('sourcestamps', [])
-        properties = Properties.fromDict(build['properties'])
-
-        for sourcestamp in sourcestamps:
-            project = sourcestamp.get('project')
-            repository = sourcestamp.get('repository')
+        project = sourcestamp.get('project')
+        repository = sourcestamp.get('repository')
 
-            if self.verbose:
-                log.info(
-                    f'Triggering {cls}.report() for project {project}, '
-                    f'repository {repository}, builder {builder_name}, '
-                    f'build number {build_number}'
-                )
-
-            try:
-                response = await self.report(build, sourcestamp, properties)
-            except Exception as e:
-                log.error(e)
-                raise e
-
-            # report() can return None to skip reporting
-            if response is None:
-                continue
+        if self.verbose:
+            log.info(
+                f'Triggering {cls}.report() for project {project}, '
+                f'repository {repository}, builder {builder_name}, '
+                f'build number {build_number}'
+            )
+
+        try:
+            response = await self.report(build, sourcestamp, properties)
+        except Exception as e:
+            log.error(e)
+            raise e
+
+        # report() can return None to skip reporting
+        if response is None:
+            return
+
+        if not 200 <= response.code < 300:
+            content = await response.content()
+            e = Exception(
+                f'Failed to execute http API call in {cls}.report() for '
+                f'repository {repository}, builder {builder_name}, build '
+                f'number {build_number} with error code {response.code} '
+                f'and response "{content}"'
+            )
+            log.error(e)
+            raise e
 
-            if not self.isStatus2XX(response.code):
-                content = await response.content()
-                e = Exception(
-                    f'Failed to execute http API call in {cls}.report() for '
-                    f'repository {repository}, builder {builder_name}, build '
-                    f'number {build_number} with error code {response.code} '
-                    f'and response "{content}"'
-                )
-                log.error(e)
-                raise e
-
-            if self.verbose:
-                log.info(
-                    f'Successful report {cls}.report() for repository '
-                    f'{repository}, builder {builder_name}, build number '
-                    f'{build_number}'
-                )
+        if self.verbose:
+            log.info(
+                f'Successful report {cls}.report() for repository '
+                f'{repository}, builder {builder_name}, build number '
+                f'{build_number}'
+            )
 
 
 class GitHubReporter(HttpStatusPush):
@@ -205,10 +300,9 @@ class GitHubReporter(HttpStatusPush):
                          'ursabot.formatters.Formatter')
         super().checkConfig(**kwargs)
 
-    @ensure_deferred
-    async def reconfigService(self, formatter, **kwargs):
-        await super().reconfigService(**kwargs)
+    def reconfigService(self, formatter, **kwargs):
         self.formatter = formatter
+        return super().reconfigService(**kwargs)
 
     async def reconfigClient(self, baseURL, headers, tokens, auth, debug,
                              verify, **kwargs):
@@ -236,16 +330,20 @@ class GitHubReporter(HttpStatusPush):
         sha = sourcestamp['revision']
 
         # determine whether the branch refers to a PR
-        m = re.search(r'refs/pull/([0-9]*)/merge', branch)
+        m = _pull_request_ref.search(branch)
         if m:
             issue = m.group(1)
         else:
             issue = None
 
         if '/' in project:
-            repo_owner, repo_name = project.split('/')
+            parts = project.split('/')
+            if len(parts) != 2:
+                raise ValueError(f'Project `{project}` must be in the form '
+                                 f'of <owner>/<name>')
+            repo_owner, repo_name = parts
         else:
-            giturl = giturlparse(repo)
+            giturl = _parse_git_url(repo)
             repo_owner, repo_name = giturl.owner, giturl.repo
 
         return dict(
@@ -262,22 +360,62 @@ class GitHubReporter(HttpStatusPush):
         raise NotImplementedError()
 
 
+@renderer
+def _context_default(props):
+    # equivalent to Interpolate('ursabot/%(prop:buildername)s') without the
+    # substitution machinery, it is rendered for every status update
+    buildername = props.getProperty('buildername', '')
+    return f'ursabot/{buildername}'
+
+
 class GitHubStatusPush(GitHubReporter):
     """Interacts with GitHub's status APIs
 
     See https://developer.github.com/v3/repos/statuses
+
+    Parameters
+    ----------
+    context : renderable, default None
+        Context of the commit status, defaults to `ursabot/<buildername>`.
+    coalesce_delay : float, default None
+        If set, status updates are delayed by this amount of seconds and only
+        the latest update of the same context and commit is sent, e.g. the
+        `pending` status of a quick build is superseded by its final state.
+        By default every status update is sent immediately.
     """
 
     name = 'GitHubStatusPush'
 
-    def __init__(self, *args, context=None, **kwargs):
-        context = context or Interpolate('ursabot/%(prop:buildername)s')
-        super().__init__(*args, context=context, **kwargs)
+    def __init__(self, *args, context=None, coalesce_delay=None, **kwargs):
+        context = context or _context_default
+        # the pending updates are kept between reconfigurations, their
+        # delayed calls send them with the reconfigured client
+        self._pending = {}
+        self._delayed_calls = {}
+        super().__init__(*args, context=context,
+                         coalesce_delay=coalesce_delay, **kwargs)
+
+    def checkConfig(self, coalesce_delay=None, **kwargs):
+        if not isinstance(coalesce_delay, (type(None), int, float)):
+            config.error('`coalesce_delay` must be a number of seconds')
+        elif coalesce_delay is not None and coalesce_delay < 0:
+            config.error('`coalesce_delay` must be a non-negative number of '
+                         'seconds')
+        super().checkConfig(**kwargs)
 
-    @ensure_deferred
-    async def reconfigService(self, context=None, **kwargs):
-        await super().reconfigService(**kwargs)
+    def reconfigService(self, context=None, coalesce_delay=None, **kwargs):
         self.context = context
+        self.coalesce_delay = coalesce_delay
+        return super().reconfigService(**kwargs)
+
+    def stopService(self):
+        # the master is shutting down, discard the pending updates
+        for call in self._delayed_calls.values():
+            if call.active():
+                call.cancel()
+        self._delayed_calls.clear()
+        self._pending.clear()
+        return super().stopService()
 
     def _state_for(self, build):
         """Maps buildbot results to github statuses
@@ -285,19 +423,12 @@ class GitHubStatusPush(GitHubReporter):
         License note:
             Contains copied parts from the original buildbot implementation.
         """
-        statuses = {
-            SUCCESS: 'success',
-            WARNINGS: 'success',
-            SKIPPED: 'success',
-            EXCEPTION: 'error',
-            CANCELLED: 'error',
-            FAILURE: 'failure',
-            RETRY: 'pending'
-        }
-
         if build['complete']:
             result = build['results']
-            return statuses.get(result, 'error')
+            if 0 <= result < len(_github_states):
+                return _github_states[result]
+            else:
+                return 'error'
         else:
             return 'pending'
 
@@ -311,18 +442,51 @@ class GitHubStatusPush(GitHubReporter):
             'context': await properties.render(self.context),
             'description': await self.formatter.render(build, self.master)
         }
-        urlpath = '/'.join([
-            '/repos',
-            params['repo_owner'],
-            params['repo_name'],
-            'statuses',
-            params['sha']
-        ])
+        urlpath = (
+            f"/repos/{params['repo_owner']}/{params['repo_name']}"
+            f"/statuses/{params['sha']}"
+        )
+
+        if self.coalesce_delay is not None:
+            # keep only the latest status of the context, the delayed call is
+            # already scheduled if there is a pending one
+            key = (urlpath, payload['context'])
+            if key not in self._pending:
+                self._delayed_calls[key] = self.master.reactor.callLater(
+                    self.coalesce_delay, self._send_pending, key
+                )
+            self._pending[key] = payload
+            # returning None skips the reporting in send()
+            return None
+
         if self.verbose:
             log.info(f'Invoking {urlpath} with payload: {payload}')
 
         return await self._http.post(urlpath, json=payload)
 
+    @ensure_deferred
+    async def _send_pending(self, key):
+        urlpath, context = key
+        self._delayed_calls.pop(key, None)
+        payload = self._pending.pop(key, None)
+        if payload is None:
+            return
+
+        if self.verbose:
+            log.info(f'Invoking {urlpath} with payload: {payload}')
+
+        try:
+            response = await self._http.post(urlpath, json=payload)
+            if not 200 <= response.code < 300:
+                content = await response.content()
+                raise Exception(
+                    f'Failed to set status {context} via {urlpath} with '
+                    f'error code {response.code} and response "{content}"'
+                )
+        except Exception as e:
+            # there is no caller to propagate the error to
+            log.error(e)
+
 
 class GitHubReviewPush(GitHubReporter):
     """Mimics the status API functionality with pull-request reviews
@@ -335,20 +499,13 @@ class GitHubReviewPush(GitHubReporter):
     name = 'GitHubReviewPush'
 
     def _event_for(self, build):
-        # maps buildbot results to github review events, blank means pending
-        events = {
-            SUCCESS: 'APPROVE',
-            WARNINGS: 'APPROVE',
-            SKIPPED: 'APPROVE',
-            EXCEPTION: 'REQUEST_CHANGES',
-            CANCELLED: 'REQUEST_CHANGES',
-            FAILURE: 'REQUEST_CHANGES',
-            RETRY: 'PENDING'
-        }
-
+        # maps buildbot results to github review events
         if build['complete']:
             result = build['results']
-            return events.get(result, 'REQUEST_CHANGES')
+            if 0 <= result < len(_github_review_events):
+                return _github_review_events[result]
+            else:
+                return 'REQUEST_CHANGES'
         else:
             return 'PENDING'
 
@@ -366,14 +523,10 @@ class GitHubReviewPush(GitHubReporter):
             'event': self._event_for(build),
             'body': await self.formatter.render(build, master=self.master)
         }
-        urlpath = '/'.join([
-            '/repos',
-            params['repo_owner'],
-            params['repo_name'],
-            'pulls',
-            params['issue'],
-            'reviews'
-        ])
+        urlpath = (
+            f"/repos/{params['repo_owner']}/{params['repo_name']}"
+            f"/pulls/{params['issue']}/reviews"
+        )
         if self.verbose:
             log.info(f'Invoking {urlpath} with payload: {payload}')
 
@@ -397,7 +550,9 @@ class GitHubCommentPush(GitHubReporter):
     )
 
     def __init__(self, formatter=None, **kwargs):
-        formatter = formatter or MarkdownFormatter()
+        # the comment contains the failing steps' logs, process them in a
+        # thread to keep the reactor responsive
+        formatter = formatter or MarkdownFormatter(threaded=True)
         super().__init__(formatter=formatter, **kwargs)
 
     @ensure_deferred
@@ -406,17 +561,18 @@ class GitHubCommentPush(GitHubReporter):
         #     Contains copied parts from the original buildbot implementation.
         params = self._extract_github_params(sourcestamp,
                                              branch=properties['branch'])
+        if not params.get('issue'):
+            raise ValueError('GitHub comment push requires a pull request, '
+                             'but the branch is not a pull request '
+                             'reference: ' + params['branch'])
+
         payload = {
             'body': await self.formatter.render(build, master=self.master)
         }
-        urlpath = '/'.join([
-            '/repos',
-            params['repo_owner'],
-            params['repo_name'],
-            'issues',
-            params['issue'],
-            'comments'
-        ])
+        urlpath = (
+            f"/repos/{params['repo_owner']}/{params['repo_name']}"
+            f"/issues/{params['issue']}/comments"
+        )
         return await self._http.post(urlpath, json=payload)
 
 
@@ -468,12 +624,11 @@ class ZulipStatusPush(HttpStatusPush):
                          'ursabot.formatters.Formatter')
         super().checkConfig(**kwargs)
 
-    @ensure_deferred
-    async def reconfigService(self, stream, topic, formatter, **kwargs):
-        await super().reconfigService(**kwargs)
+    def reconfigService(self, stream, topic, formatter, **kwargs):
         self.topic = topic
         self.stream = stream
         self.formatter = formatter
+        return super().reconfigService(**kwargs)
 
     @ensure_deferred
     async def report(self, build, sourcestamp, properties):
@@ -19,15 +19,21 @@ __all__ = [
 ]
 
 
+def _builder_name(builder):
+    # accept already resolved builder names as well
+    return builder if isinstance(builder, str) else builder.name
+
+
 class SchedulerMixin:
 
     def __init__(self, *args, builders, **kwargs):
         if callable(builders):
             @util.renderable
             def builder_names(props):
-                return [builder.name for builder in builders(props)]
+                return list(map(_builder_name, builders(props)))
         else:
-            builder_names = [b.name for b in builders]
+            # resolved once per scheduler, the names are static
+            builder_names = list(map(_builder_name, builders))
 
         super().__init__(*args, builderNames=builder_names, **kwargs)
 
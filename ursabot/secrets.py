@@ -16,38 +16,150 @@
 # Copyright Buildbot Team Members
 
 import os
+import time
+from pathlib import Path
 
-from twisted.internet import utils
+from twisted.internet import defer, threads, utils
+from buildbot import config
 from buildbot.secrets.providers import passwordstore
 from buildbot.util.logger import Logger
 
 from .utils import ensure_deferred
 
+try:
+    import gpg
+except ImportError:
+    gpg = None
+
 __all__ = ['SecretInPass']
 
 log = Logger()
 
 
+def _first_line(output):
+    # the secret is the first line, don't decode the rest of the entry
+    return output.split(b'\n', 1)[0].rstrip(b'\r').decode('utf-8', 'ignore')
+
+
 class SecretInPass(passwordstore.SecretInPass):
-    """Secret stored in a password store"""
+    """Secret stored in a password store
+
+    Parameters
+    ----------
+    passphrase : str, default None
+        Passphrase of the gpg key used to encrypt the password store.
+    dirname : str or Path, default None
+        Path to the password store, defaults to pass' default location.
+    cache_ttl : float, default 60
+        Decrypted secrets are kept in memory for this amount of seconds to
+        avoid spawning `pass` again for repeated lookups of the same entry.
+        Pass 0 to disable caching.
+    gpgme : bool, default False
+        Decrypt the entries of the password store in-process using the gpg
+        python bindings (GPGME) instead of spawning `pass` processes.
+    """
 
     name = 'SecretInPass'
 
-    def checkConfig(self, passphrase=None, dirname=None):
-        self.checkPassIsInPath()
+    def __init__(self, *args, **kwargs):
+        # the lookups in progress are kept between reconfigurations
+        self._waiters = {}
+        self._batch = []
+        super().__init__(*args, **kwargs)
+
+    def checkConfig(self, passphrase=None, dirname=None, cache_ttl=60,
+                    gpgme=False):
+        if gpgme:
+            if gpg is None:
+                config.error('`gpgme` requires the gpg python package')
+        else:
+            self.checkPassIsInPath()
         if dirname:
             self.checkPassDirectoryIsAvailableAndReadable(dirname)
+        if not isinstance(cache_ttl, (int, float)) or cache_ttl < 0:
+            config.error('`cache_ttl` must be a non-negative number of '
+                         'seconds')
 
-    def reconfigService(self, passphrase=None, dirname=None):
+    def reconfigService(self, passphrase=None, dirname=None, cache_ttl=60,
+                        gpgme=False):
         self._env = os.environ.copy()
         if passphrase:
             self._env['PASSWORD_STORE_GPG_OPTS'] = f'--passphrase {passphrase}'
         if dirname:
             self._env['PASSWORD_STORE_DIR'] = str(dirname)
+        self._gpgme = gpgme
+        self._passphrase = passphrase
+        self._store = Path(
+            self._env.get('PASSWORD_STORE_DIR', '~/.password-store')
+        ).expanduser()
+        self._cache_ttl = cache_ttl
+        self._cache = {}
 
     @ensure_deferred
     async def get(self, entry):
         """Get the value from pass identified by 'entry'"""
+        now = time.monotonic()
+        try:
+            timestamp, value = self._cache[entry]
+        except KeyError:
+            pass
+        else:
+            if now - timestamp < self._cache_ttl:
+                return value
+
+        # concurrent lookups of the same entry wait for the already running
+        # pass invocation instead of spawning their own
+        if entry in self._waiters:
+            waiter = defer.Deferred()
+            self._waiters[entry].append(waiter)
+            return await waiter
+
+        self._waiters[entry] = waiters = []
+        try:
+            value = await self._pass(entry)
+        except Exception as e:
+            for waiter in waiters:
+                waiter.errback(e)
+            raise
+        finally:
+            self._waiters.pop(entry, None)
+
+        if value is not None and self._cache_ttl:
+            self._cache[entry] = (now, value)
+        for waiter in waiters:
+            waiter.callback(value)
+
+        return value
+
+    def _pass(self, entry):
+        # lookups issued within the same reactor iteration, e.g. rendering
+        # all the secrets of a reporter, are resolved by a single process
+        d = defer.Deferred()
+        if not self._batch:
+            self.master.reactor.callLater(0, self._flush)
+        self._batch.append((entry, d))
+        return d
+
+    @ensure_deferred
+    async def _flush(self):
+        batch, self._batch = self._batch, []
+        entries = [entry for entry, _ in batch]
+
+        try:
+            if self._gpgme:
+                values = await self._decrypt(entries)
+            elif len(entries) == 1:
+                values = [await self._pass_one(entries[0])]
+            else:
+                values = await self._pass_many(entries)
+        except Exception as e:
+            for _, d in batch:
+                d.errback(e)
+        else:
+            for (_, d), value in zip(batch, values):
+                d.callback(value)
+
+    async def _pass_one(self, entry):
         try:
             output = await utils.getProcessOutput(
                 'pass',
@@ -58,4 +170,70 @@ class SecretInPass(passwordstore.SecretInPass):
             log.error(e)
             return None
         else:
-            return output.decode('utf-8', 'ignore').splitlines()[0]
+            return _first_line(output)
+
+    async def _decrypt(self, entries):
+        results = await threads.deferToThread(self._decrypt_files, entries)
+        values = []
+        for result in results:
+            if isinstance(result, Exception):
+                log.error(result)
+                values.append(None)
+            else:
+                values.append(_first_line(result))
+        return values
+
+    def _decrypt_files(self, entries):
+        # blocking, executed in a single thread call with one gpg context
+        # for the whole batch, errors are returned instead of raised
+        results = []
+        with gpg.Context() as ctx:
+            for entry in entries:
+                path = self._store / f'{entry}.gpg'
+                try:
+                    with path.open('rb') as fp:
+                        plaintext, _, _ = ctx.decrypt(
+                            fp, passphrase=self._passphrase, verify=False
+                        )
+                except Exception as e:
+                    results.append(e)
+                else:
+                    results.append(plaintext)
+        return results
+
+    # prints a line for each entry, either + followed by the first line of
+    # the secret or - if pass has failed to decrypt it
+    _batch_script = (
+        'for entry; do '
+        'if value=$(pass "$entry" 2>/dev/null); then '
+        'printf "+%s\\n" "$(printf "%s\\n" "$value" | head -n 1)"; '
+        'else echo -; fi; '
+        'done'
+    )
+
+    async def _pass_many(self, entries):
+        try:
+            output = await utils.getProcessOutput(
+                'sh',
+                args=['-c', self._batch_script, 'sh', *entries],
+                env=self._env
+            )
+        except Exception as e:
+            log.error(e)
+            lines = []
+        else:
+            lines = output.decode('utf-8', 'ignore').splitlines()
+
+        if len(lines) != len(entries):
+            log.error('Failed to read the secrets in a single batch, falling '
+                      'back to query them one by one')
+            return [await self._pass_one(entry) for entry in entries]
+
+        values = []
+        for entry, line in zip(entries, lines):
+            if line.startswith('+'):
+                values.append(line[1:])
+            else:
+                log.error(f'Failed to read secret `{entry}` from pass')
+                values.append(None)
+        return values
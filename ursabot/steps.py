@@ -8,7 +8,10 @@
 # derivative works of Buildbot. The above license only applies to code that
 # is not marked as such.
 
-from twisted.internet import threads
+import shlex
+from concurrent.futures import ProcessPoolExecutor
+
+from twisted.internet import defer, threads
 
 from buildbot.plugins import steps, util
 from buildbot.process import buildstep
@@ -18,7 +21,13 @@ from buildbot.interfaces import IRenderable
 
 from .utils import ensure_deferred
 
+try:
+    import cloudpickle
+except ImportError:
+    cloudpickle = None
+
 __all__ = [
+    'BatchedShellCommand',
     'CMake',
     'Env',
     'GitHub',
@@ -70,6 +79,21 @@ class ResultLogMixin(buildstep.BuildStep, CompositeStepMixin):
         return result
 
 
+def _static_command(*parts):
+    # flatten the command at construction time if it doesn't contain any
+    # renderables, so it doesn't need to be rendered on each build
+    cmd = []
+    for part in parts:
+        if isinstance(part, str):
+            cmd.append(part)
+        elif (isinstance(part, (list, tuple)) and
+              all(isinstance(arg, str) for arg in part)):
+            cmd.extend(part)
+        else:
+            return None
+    return cmd
+
+
 class ShellCommand(buildstep.ShellMixin, buildstep.BuildStep):
     name = 'Shell'
     args = tuple()
@@ -81,10 +105,14 @@ class ShellCommand(buildstep.ShellMixin, buildstep.BuildStep):
         if not IRenderable.providedBy(command) and not command:
             raise ValueError('No command was provided')
 
-        cmd = util.FlattenList([command, args])
-        if as_shell:
-            # runs the command as is without quoting any arguments of it
-            cmd = util.Transform(' '.join, cmd)
+        cmd = _static_command(command, args)
+        if cmd is None:
+            cmd = util.FlattenList([command, args])
+            if as_shell:
+                # runs the command as is without quoting any arguments of it
+                cmd = util.Transform(' '.join, cmd)
+        elif as_shell:
+            cmd = ' '.join(cmd)
 
         kwargs['command'] = cmd
         kwargs = self.setupShellMixin(kwargs)
@@ -97,10 +125,78 @@ class ShellCommand(buildstep.ShellMixin, buildstep.BuildStep):
         return cmd.results()
 
 
+def _shell_script(commands):
+    lines = ['set -e']
+    for workdir, command in commands:
+        if not isinstance(command, str):
+            command = ' '.join(map(shlex.quote, command))
+        if workdir:
+            # run in a subshell to keep the working directory of the script
+            command = f'(cd {shlex.quote(workdir)} && {command})'
+        lines.append(command)
+    return '\n'.join(lines)
+
+
+class BatchedShellCommand(ShellCommand):
+    """Executes the commands of multiple shell steps as a single script
+
+    Saves the master-worker roundtrips of running the steps one by one, at
+    the cost of having a single log and result for all of them. The script
+    stops at the first failing command.
+
+    Parameters
+    ----------
+    steps : List[ShellCommand]
+        Only the command and the workdir of the steps are used, the workdirs
+        are relative to the workdir of the batched step. Steps with custom
+        environment variables and steps which assemble their command in
+        `run()`, like CMake, cannot be batched.
+    """
+
+    name = 'Batched'
+    command = ('/bin/sh', '-c')
+
+    def __init__(self, steps, **kwargs):
+        if not steps:
+            raise ValueError('No steps were provided')
+
+        commands = []
+        for step in steps:
+            command = getattr(step, 'command', None)
+            if not command:
+                raise ValueError(
+                    f'Step `{step.name}` has no command defined at '
+                    f'construction time, so it cannot be batched'
+                )
+            if getattr(step, 'env', None):
+                raise ValueError(
+                    f'Step `{step.name}` sets environment variables, so it '
+                    f'cannot be batched'
+                )
+            commands.append((getattr(step, 'workdir', None), command))
+
+        script = util.Transform(_shell_script, commands)
+        super().__init__(args=[script], **kwargs)
+
+
 class CMake(steps.CMake):
 
     name = 'CMake'
 
+    def __init__(self, definitions=None, **kwargs):
+        # format the plain definitions once, only the renderable ones need to
+        # be rendered for each build
+        self._static_definitions = []
+        if isinstance(definitions, dict):
+            renderables = {}
+            for k, v in definitions.items():
+                if IRenderable.providedBy(v):
+                    renderables[k] = v
+                elif v is not None:
+                    self._static_definitions.append(f'-D{k}={v}')
+            definitions = renderables
+        super().__init__(definitions=definitions, **kwargs)
+
     @ensure_deferred
     async def run(self):
         """Create and run CMake command
@@ -116,14 +212,15 @@ class CMake(steps.CMake):
         if self.path:
             command.append(self.path)
 
-        if self.definitions is not None:
-            for k, v in self.definitions.items():
-                # handle None values as missing
-                if v is not None:
-                    command.append(f'-D{k}={v}')
-
-        if self.options is not None:
-            command.extend(self.options)
+        command.extend(self._static_definitions)
+        definitions, options = self.definitions, self.options
+        if definitions is not None:
+            # handle None values as missing
+            command.extend(
+                f'-D{k}={v}' for k, v in definitions.items() if v is not None
+            )
+        if options is not None:
+            command.extend(options)
 
         cmd = await self.makeRemoteShellCommand(command=command)
         await self.runCommand(cmd)
@@ -180,6 +277,10 @@ class SetPropertiesFromEnv(buildstep.BuildStep):
 
     def __init__(self, variables, source='WorkerEnvironment', **kwargs):
         self.variables = variables
+        # windows variable names are folded to uppercase, see run()
+        self._uppercase_variables = {
+            prop: var.upper() for prop, var in variables.items()
+        }
         self.source = source
         super().__init__(**kwargs)
 
@@ -195,14 +296,14 @@ class SetPropertiesFromEnv(buildstep.BuildStep):
         # a case-sensitive dictionary in worker_environ.  Fortunately, that
         # dictionary is also folded to uppercase, so we can simply fold the
         # variable names to uppercase to duplicate the case-insensitivity.
-        fold_to_uppercase = (self.worker.worker_system == 'win32')
+        if self.worker.worker_system == 'win32':
+            variables = self._uppercase_variables
+        else:
+            variables = self.variables
         environ = self.worker.worker_environ
 
         log = []
-        for prop, var in self.variables.items():
-            if fold_to_uppercase:
-                var = var.upper()
-
+        for prop, var in variables.items():
             value = environ.get(var, None)
             if value:
                 # note that the property is not uppercased
@@ -214,23 +315,87 @@ class SetPropertiesFromEnv(buildstep.BuildStep):
         return SUCCESS
 
 
+_process_pool = None
+
+
+def _shutdown_process_pool():
+    global _process_pool
+    if _process_pool is not None:
+        _process_pool.shutdown(wait=False)
+        _process_pool = None
+
+
+def _call_pickled(payload):
+    return cloudpickle.loads(payload)()
+
+
+def _call_in_process(reactor, fn):
+    # the pool is shared between the steps, created on first use and shut
+    # down together with the master's reactor
+    global _process_pool
+    if _process_pool is None:
+        _process_pool = ProcessPoolExecutor()
+        reactor.addSystemEventTrigger('before', 'shutdown',
+                                      _shutdown_process_pool)
+
+    d = defer.Deferred()
+
+    def done(future):
+        # executed in the executor's thread, deliver the result to the
+        # reactor's thread instead of blocking one of its pool threads
+        try:
+            result = future.result()
+        except Exception as e:
+            reactor.callFromThread(d.errback, e)
+        else:
+            reactor.callFromThread(d.callback, result)
+
+    future = _process_pool.submit(_call_pickled, cloudpickle.dumps(fn))
+    future.add_done_callback(done)
+    return d
+
+
 # TODO(kszucs): this function is executed on the master's side, to execute
 # remote functions use cloudpickle
 class PythonFunction(buildstep.BuildStep):
-    """Executes arbitrary python function."""
+    """Executes arbitrary python function.
+
+    Parameters
+    ----------
+    fn : Callable
+        Function without arguments, its return value is saved as a log.
+    blocking : bool, default True
+        Whether the function may block. Blocking functions are executed in
+        the reactor's thread pool, cheap ones are called directly to avoid
+        the overhead of the thread dispatching.
+    process_pool : bool, default False
+        Execute the function in a separate process instead of a thread, so
+        CPU bound functions don't hold the master's GIL. The function is
+        serialized with cloudpickle.
+    """
 
     name = 'PythonFunction'
     description = ['Executing']
     descriptionDone = ['Executed']
 
-    def __init__(self, fn, **kwargs):
+    def __init__(self, fn, blocking=True, process_pool=False, **kwargs):
+        if process_pool and cloudpickle is None:
+            raise ValueError('`process_pool` requires the cloudpickle package')
         self.fn = fn
+        self.blocking = blocking
+        self.process_pool = process_pool
         super().__init__(**kwargs)
 
     @ensure_deferred
     async def run(self):
         try:
-            result = await threads.deferToThread(self.fn)
+            if self.process_pool:
+                result = await _call_in_process(self.master.reactor,
+                                                self.fn)
+            elif self.blocking:
+                result = await threads.deferToThread(self.fn)
+            else:
+                result = self.fn()
         except Exception as e:
             await self.addLogWithException(e)
             return FAILURE
@@ -241,22 +406,22 @@ class PythonFunction(buildstep.BuildStep):
 
 class Env(ShellCommand):
     name = 'Environment'
-    command = ['env']
+    command = ('env',)
 
 
 class SetupPy(ShellCommand):
     name = 'Setup.py'
-    command = ['python', 'setup.py']
+    command = ('python', 'setup.py')
 
 
 class PyTest(ShellCommand):
     name = 'PyTest'
-    command = ['pytest', '-v']
+    command = ('pytest', '-v')
 
 
 class Pip(ShellCommand):
     name = 'Pip'
-    command = ['pip']
+    command = ('pip',)
 
 
 Mkdir = steps.MakeDirectory
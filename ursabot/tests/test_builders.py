@@ -30,6 +30,12 @@ f = Worker('worker_f', password=None, platform=amd64_ubuntu)
 g = Worker('worker_g', password=None, platform=arm64v8_debian)
 h = Worker('worker_h', password=None, platform=amd64_macos)
 i = Worker('worker_i', password=None, platform=arm64v8_debian)
+linux_docker_worker = DockerLatentWorker(
+    'worker_linux_docker',
+    password=None,
+    docker_host=docker_host,
+    platform=Platform(arch='amd64', system='linux', distro=None, version=None)
+)
 
 docker_workers = [a, b]
 plain_workers = [c, d, e, f, g, h, i]
@@ -314,6 +320,30 @@ def test_builder_as_config():
     assert conf.properties == {'A': 'a'}
 
 
+def test_builder_max_simultaneous_builds():
+    class FakeBuilder:
+        def __init__(self, building):
+            self.building = building
+
+    workers = [LocalWorker('worker_a')]
+    requests = ['oldest', 'newest']
+
+    conf = Builder(name='test', workers=workers).as_config()
+    assert conf.nextBuild is None
+
+    conf = Builder(name='test', workers=workers,
+                   max_simultaneous_builds=2).as_config()
+    assert conf.nextBuild(FakeBuilder([]), requests) == 'oldest'
+    assert conf.nextBuild(FakeBuilder(['build']), requests) == 'oldest'
+    assert conf.nextBuild(FakeBuilder(['build'] * 2), requests) is None
+
+    conf = Builder(name='test', workers=workers, max_simultaneous_builds=1,
+                   next_build=lambda builder, requests: requests[-1])
+    conf = conf.as_config()
+    assert conf.nextBuild(FakeBuilder([]), requests) == 'newest'
+    assert conf.nextBuild(FakeBuilder(['build']), requests) is None
+
+
 def test_docker_specific_properties():
     def to_gigabytes(bytes):
         import math
@@ -360,97 +390,77 @@ def test_builder_description():
     assert builder.description == 'Doc is the default'
 
 
-def test_builder_worker_filter():
-    class Good1(Builder):
+@pytest.mark.parametrize('accepts', [
+    lambda w: True,
+    Filter(name=Matching('worker_*'))
+])
+def test_builder_worker_filter(accepts):
+    class Good(Builder):
         name = 'test'
         steps = []
-        worker_filter = lambda w: True  # noqa
-
-    class Good2(Builder):
-        name = 'test'
-        steps = []
-        worker_filter = Filter(
-            name=Matching('worker_*')
-        )
-
-    for good in [Good1, Good2]:
-        workers = plain_workers
-        builder = good(workers=workers)
-        assert builder.workers == plain_workers
-
-
-def test_builder_worker_compatibilities():
-    class TestBuilder(Builder):
-        pass
+        worker_filter = accepts
 
-    class TestDockeBuilder(DockerBuilder):
-        pass
-
-    with pytest.raises(TypeError):
-        TestBuilder(name='test', workers=docker_workers)
-    builder = TestBuilder(name='test', workers=plain_workers)
+    builder = Good(workers=plain_workers)
     assert builder.workers == plain_workers
 
-    with pytest.raises(TypeError):
-        TestDockeBuilder(name='test', image=ubuntu_docker_image,
-                         workers=plain_workers)
-    builder = TestDockeBuilder(name='test', image=ubuntu_docker_image,
-                               workers=docker_workers)
-    assert builder.workers == docker_workers
-
-
-def test_builder_combine_with_unfildered_workers():
-    class NoFilterBuilder(Builder):
-        steps = []
-
-    pairs = [
-        ('AMD64 Macos 10.14 Test', [h]),
-        ('AMD64 Ubuntu 18.04 Test', [c, e, f]),
-        ('AMD64 Debian 10 Test', [d]),
-        ('ARM64V8 Debian 10 Test', [g, i]),
-    ]
-    expected = {n: NoFilterBuilder(name=n, workers=ws) for n, ws in pairs}
-    builders = NoFilterBuilder.combine_with(name='Test', workers=plain_workers)
-
-    assert len(expected) == len(builders)
-    for builder in builders:
-        assert builder == expected[builder.name]
-
-
-def test_builder_combine_with_only_linux_workers():
-    class LinuxBuilder(Builder):
-        steps = []
-        worker_filter = lambda w: w.platform.system == 'linux'  # noqa
 
-    pairs = [
-        ('AMD64 Ubuntu 18.04 Testing', [c, e, f]),
-        ('AMD64 Debian 10 Testing', [d]),
-        ('ARM64V8 Debian 10 Testing', [g, i]),
-    ]
-    expected = {n: LinuxBuilder(name=n, workers=ws) for n, ws in pairs}
-    builders = LinuxBuilder.combine_with(name='Testing', workers=all_workers)
-
-    assert len(expected) == len(builders)
-    for builder in builders:
-        assert builder == expected[builder.name]
-
-
-def test_builder_combine_with_darwin_workers():
-    class MacosBuilder(Builder):
-        worker_filter = lambda worker: worker.supports(amd64_macos)  # noqa
+@pytest.mark.parametrize(('cls', 'kwargs', 'workers', 'error'), [
+    (Builder, {}, docker_workers, TypeError),
+    (Builder, {}, plain_workers, None),
+    (DockerBuilder, {'image': ubuntu_docker_image}, plain_workers, TypeError),
+    (DockerBuilder, {'image': ubuntu_docker_image}, docker_workers, None),
+])
+def test_builder_worker_compatibilities(cls, kwargs, workers, error):
+    if error is None:
+        builder = cls(name='test', workers=workers, **kwargs)
+        assert builder.workers == workers
+    else:
+        with pytest.raises(error):
+            cls(name='test', workers=workers, **kwargs)
+
+
+@pytest.mark.parametrize(('accepts', 'workers', 'name', 'expected'), [
+    (
+        lambda w: True,
+        plain_workers,
+        'Test',
+        {
+            'AMD64 Macos 10.14 Test': [h],
+            'AMD64 Ubuntu 18.04 Test': [c, e, f],
+            'AMD64 Debian 10 Test': [d],
+            'ARM64V8 Debian 10 Test': [g, i],
+        }
+    ),
+    (
+        lambda w: w.platform.system == 'linux',
+        all_workers,
+        'Testing',
+        {
+            'AMD64 Ubuntu 18.04 Testing': [c, e, f],
+            'AMD64 Debian 10 Testing': [d],
+            'ARM64V8 Debian 10 Testing': [g, i],
+        }
+    ),
+    (
+        lambda w: w.supports(amd64_macos),
+        all_workers,
+        'Test',
+        {
+            'AMD64 Macos 10.14 Test': [h]
+        }
+    )
+])
+def test_builder_combine_with(accepts, workers, name, expected):
+    class Test(Builder):
+        worker_filter = accepts
 
-    pairs = [
-        ('AMD64 Macos 10.14 Test', [h])
-    ]
-    expected = {n: MacosBuilder(name=n, workers=ws) for n, ws in pairs}
-    builders = MacosBuilder.combine_with(name='Test', workers=all_workers)
+    builders = Test.combine_with(name=name, workers=workers)
 
-    assert len(expected) == len(builders)
-    for builder in builders:
-        assert builder == expected[builder.name]
+    assert all(type(builder) is Test for builder in builders)
+    assert {b.name: b.workers for b in builders} == expected
 
 
-def test_docker_builder_worker_and_image_filters():
+def test_docker_builder_worker_order():
     class Good(DockerBuilder):
         name = 'test'
         steps = []
@@ -459,73 +469,27 @@ def test_docker_builder_worker_and_image_filters():
     assert builder.image == ubuntu_docker_image
     assert builder.workers == [b, a]
 
-    ubuntu_image = DockerImage(
-        name='test',
-        base='ubuntu:18.04',
-        platform=Platform(
-            distro='ubuntu',
-            arch='amd64',
-            version='18.04'
-        )
-    )
-    debian_image = DockerImage(
-        name='test',
-        base='ubuntu:18.04',
-        platform=Platform(
-            distro='debian',
-            arch='amd64',
-            version='10'
-        )
-    )
-    darwin_worker = LocalWorker(
-        'test-worker-darwin',
-        platform=Platform(
-            arch='amd64',
-            system='darwin',
-            distro='macos',
-            version='10.14.6'
-        )
-    )
-    linux_docker_worker = DockerLatentWorker(
-        'test-worker-linux-docker',
-        password=None,
-        docker_host='unix:///var/run/docker.sock',
-        platform=Platform(
-            arch='amd64',
-            system='linux',
-            distro=None,
-            version=None
-        )
-    )
 
+@pytest.mark.parametrize(('image', 'workers', 'error'), [
+    (ubuntu_docker_image, [linux_docker_worker], None),
+    (debian_docker_image, [linux_docker_worker], ValueError),
+    (ubuntu_docker_image, [h], TypeError),
+    (ubuntu_docker_image, [linux_docker_worker, h], TypeError),
+])
+def test_docker_builder_worker_and_image_filters(image, workers, error):
     class UbuntuDockerOnLinuxHost(DockerBuilder):
         name = 'test'
         steps = []
         worker_filter = lambda w: w.platform.system == 'linux'  # noqa
         image_filter = lambda i: i.platform.distro == 'ubuntu'  # noqa
 
-    bldr = UbuntuDockerOnLinuxHost(
-        image=ubuntu_image,
-        workers=[linux_docker_worker]
-    )
-    assert bldr.image == ubuntu_image
-    assert bldr.workers == [linux_docker_worker]
-
-    with pytest.raises(ValueError):
-        UbuntuDockerOnLinuxHost(
-            image=debian_image,
-            workers=[linux_docker_worker]
-        )
-    with pytest.raises(TypeError):
-        UbuntuDockerOnLinuxHost(
-            image=ubuntu_image,
-            workers=[darwin_worker]
-        )
-    with pytest.raises(TypeError):
-        UbuntuDockerOnLinuxHost(
-            image=ubuntu_image,
-            workers=[linux_docker_worker, darwin_worker]
-        )
+    if error is None:
+        bldr = UbuntuDockerOnLinuxHost(image=image, workers=workers)
+        assert bldr.image == image
+        assert bldr.workers == workers
+    else:
+        with pytest.raises(error):
+            UbuntuDockerOnLinuxHost(image=image, workers=workers)
 
 
 def test_docker_builder_combine_with_workers_and_images():
@@ -533,26 +497,12 @@ def test_docker_builder_combine_with_workers_and_images():
         pass
 
     builders = Test.combine_with(workers=all_workers, images=all_images)
-    expected = {
-        'Ubuntu': Test(
-            name='Ubuntu',
-            image=ubuntu_docker_image,
-            workers=docker_workers
-        ),
-        'Debian': Test(
-            name='Debian',
-            image=debian_docker_image,
-            workers=docker_workers
-        ),
-        'Alpine': Test(
-            name='Alpine',
-            image=alpine_docker_image,
-            workers=docker_workers
-        )
+    assert all(type(builder) is Test for builder in builders)
+    assert {b.name: (b.image, b.workers) for b in builders} == {
+        'Ubuntu': (ubuntu_docker_image, docker_workers),
+        'Debian': (debian_docker_image, docker_workers),
+        'Alpine': (alpine_docker_image, docker_workers)
     }
-    assert len(builders) == len(expected)
-    for builder in builders:
-        assert builder == expected[builder.name]
 
     def is_debian_based(image):
         return image.platform.distro in {'debian', 'ubuntu'}
@@ -561,18 +511,8 @@ def test_docker_builder_combine_with_workers_and_images():
         image_filter = is_debian_based
 
     builders = TestApt.combine_with(workers=all_workers, images=all_images)
-    expected = {
-        'Ubuntu': TestApt(
-            name='Ubuntu',
-            image=ubuntu_docker_image,
-            workers=docker_workers
-        ),
-        'Debian': TestApt(
-            name='Debian',
-            image=debian_docker_image,
-            workers=docker_workers
-        )
+    assert all(type(builder) is TestApt for builder in builders)
+    assert {b.name: (b.image, b.workers) for b in builders} == {
+        'Ubuntu': (ubuntu_docker_image, docker_workers),
+        'Debian': (debian_docker_image, docker_workers)
     }
-    assert len(builders) == len(expected)
-    for builder in builders:
-        assert builder == expected[builder.name]
@@ -14,7 +14,26 @@ from ursabot.docker import DockerImage, ImageCollection
 from ursabot.docker import RUN, CMD, WORKDIR, apk, apt, pip, conda
 
 
-@pytest.fixture
+_EXPECTED_DOCKERFILE = dedent("""
+    FROM ubuntu:18.04
+
+    RUN export DEBIAN_FRONTEND=noninteractive && \\
+        apt-get update -y -q && \\
+        apt-get install -y -q \\
+            python \\
+            python-pip && \\
+        rm -rf /var/lib/apt/lists/*
+
+    RUN pip install \\
+            six \\
+            toolz
+
+    CMD ["python"]
+    WORKDIR /buildbot
+""").strip()
+
+
+@pytest.fixture(scope='module')
 def image():
     return DockerImage(
         name='worker-image',
@@ -33,7 +52,7 @@ def image():
     )
 
 
-@pytest.fixture
+@pytest.fixture(scope='module')
 def collection():
     a = DockerImage(
         name='a',
@@ -65,7 +84,7 @@ def collection():
     j = DockerImage('j', base=e, steps=[])
     k = DockerImage('k', base=e, steps=[])
     return ImageCollection(
-        # not in order to test toposort
+        # not in order to test the topological sort of _build_order
         [k, b, e, j, i, a, c, d, f, g, h]
     )
 
@@ -153,24 +172,7 @@ def test_dockerfile_dsl(image):
     assert image.workdir == '/buildbot'
 
     dockerfile = str(image.dockerfile)
-    expected = dedent("""
-        FROM ubuntu:18.04
-
-        RUN export DEBIAN_FRONTEND=noninteractive && \\
-            apt-get update -y -q && \\
-            apt-get install -y -q \\
-                python \\
-                python-pip && \\
-            rm -rf /var/lib/apt/lists/*
-
-        RUN pip install \\
-                six \\
-                toolz
-
-        CMD ["python"]
-        WORKDIR /buildbot
-    """)
-    assert dockerfile.strip() == expected.strip()
+    assert dockerfile.strip() == _EXPECTED_DOCKERFILE
 
 
 def test_docker_image_hashing(collection):
@@ -205,6 +207,50 @@ def test_image_collection(collection):
     assert sorted(centos_images) == ['b', 'f', 'g', 'h', 'i']
 
 
+def test_image_collection_build_order(collection):
+    generations = [
+        sorted(image.name for image in generation)
+        for generation in collection._build_order()
+    ]
+    assert generations == [
+        ['a', 'b'],
+        ['c', 'f', 'g'],
+        ['d', 'e', 'h', 'i'],
+        ['j', 'k']
+    ]
+
+
+def test_image_collection_circular_dependencies():
+    a = DockerImage(
+        name='a',
+        base='ubuntu:18.04',
+        platform=Platform(distro='ubuntu', arch='amd64', version='18.04')
+    )
+    b = DockerImage('b', base=a)
+    a.base = b
+    with pytest.raises(ValueError, match='circular dependencies'):
+        ImageCollection([a, b])._build_order()
+
+
+@pytest.mark.parametrize('parallelism', [1, 4])
+def test_image_collection_build_parallelism(monkeypatch, collection,
+                                            parallelism):
+    built = []
+    monkeypatch.setattr(DockerImage, 'build',
+                        lambda image, **kwargs: built.append(image))
+
+    collection.build(parallelism=parallelism)
+    assert sorted(image.name for image in built) == sorted(
+        image.name for image in collection
+    )
+    for image in built:
+        if isinstance(image.base, DockerImage):
+            assert built.index(image.base) < built.index(image)
+
+    with pytest.raises(ValueError):
+        collection.build(parallelism=0)
+
+
 @pytest.mark.docker
 @pytest.mark.integration
 def test_image_collection_build(collection):
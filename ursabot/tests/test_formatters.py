@@ -11,6 +11,7 @@
 import textwrap
 import traceback
 from pathlib import Path
+from functools import lru_cache
 
 from twisted.trial import unittest
 from buildbot.process.results import FAILURE, SUCCESS, EXCEPTION
@@ -22,15 +23,63 @@ from ursabot.formatters import Formatter, MarkdownFormatter
 from ursabot.utils import ensure_deferred
 
 
+# expected markdown messages, dedented once at import time
+_EXPECTED_STATUS = textwrap.dedent("""
+    [Builder1 (#{build_id})]({build_url}) builder {status}
+
+    Revision: {revision}
+""").strip()
+_EXPECTED_STDERR = textwrap.dedent("""
+    [Builder1 (#{build_id})]({build_url}) builder failed.
+
+    Revision: {revision}
+
+    Benchmark: `/bin/run-benchmark` step's stderr:
+    ```
+    {stderr}
+    ```
+""").strip()
+_EXPECTED_TRACEBACK = textwrap.dedent("""
+    [Builder1 (#{build_id})]({build_url}) builder failed with an exception.
+
+    Revision: {revision}
+
+    Benchmark: `/bin/run-benchmark` step's traceback:
+    ```pycon
+    {traceback}
+    ```
+""").strip()
+
+
+@lru_cache(maxsize=None)
+def _read_fixture(name):
+    # the fixtures are shared by many test cases and don't change during
+    # the test run, so read each of them once
+    path = Path(__file__).parent / 'fixtures' / f'{name}'
+    return path.read_text()
+
+
+def _format_exception(exc_type):
+    try:
+        raise exc_type()
+    except Exception:
+        return traceback.format_exc().strip()
+
+
 class TestFormatterBase(TestReactorMixin, unittest.TestCase):
 
     BUILD_ID = 21
     BUILD_URL = 'http://localhost:8080/#builders/80/builds/1'
     REVISION = '989ec01feb96c2563f39b1751bcc29822c8db4b8'
+    BUILD_PROPERTIES = (
+        ('buildername', 'Builder1'),
+        ('workername', 'wrkr'),
+        ('revision', REVISION),
+        ('reason', 'because')
+    )
 
     def load_fixture(self, name):
-        path = Path(__file__).parent / 'fixtures' / f'{name}'
-        return path.read_text()
+        return _read_fixture(name)
 
     def setUp(self):
         # License note:
@@ -60,18 +109,12 @@ class TestFormatterBase(TestReactorMixin, unittest.TestCase):
                          workerid=13, masterid=92, results=results1),
             fakedb.Build(id=21, number=1, builderid=80, buildrequestid=12,
                          workerid=13, masterid=92, results=results1),
+            *(
+                fakedb.BuildProperty(buildid=_id, name=name, value=value)
+                for _id in (20, 21)
+                for name, value in self.BUILD_PROPERTIES
+            )
         ])
-        for _id in (20, 21):
-            self.db.insertTestData([
-                fakedb.BuildProperty(buildid=_id, name='buildername',
-                                     value='Builder1'),
-                fakedb.BuildProperty(buildid=_id, name='workername',
-                                     value='wrkr'),
-                fakedb.BuildProperty(buildid=_id, name='revision',
-                                     value=self.REVISION),
-                fakedb.BuildProperty(buildid=_id, name='reason',
-                                     value='because')
-            ])
 
     async def render(self, previous, current, buildsetid=99, complete=True,
                      **kwargs):
@@ -116,6 +159,9 @@ class TestFormatter(TestFormatterBase):
 
 class TestMarkdownFormatter(TestFormatterBase):
 
+    TRACEBACK1 = _format_exception(ValueError)
+    TRACEBACK2 = _format_exception(TypeError)
+
     def setupDb(self, current, previous, log1=None, log2=None):
         # License note:
         #    Copied from the original buildbot implementation with
@@ -131,132 +177,89 @@ class TestMarkdownFormatter(TestFormatterBase):
                         results=current, state_string='/bin/run-benchmark')
         ])
 
-        if current == SUCCESS:
-            self.db.insertTestData([
-                fakedb.Log(id=60, stepid=51, name='stdio', slug='stdio',
-                           type='s', num_lines=len(log1)),
-                fakedb.Log(id=61, stepid=53, name='stdio', slug='stdio',
-                           type='s', num_lines=len(log2)),
-                fakedb.LogChunk(logid=60, first_line=0, last_line=4,
-                                compressed=0, content='\n'.join(log1)),
-                fakedb.LogChunk(logid=61, first_line=0, last_line=6,
-                                compressed=0, content='\n'.join(log2))
-            ])
-        elif current == FAILURE:
-            self.db.insertTestData([
-                fakedb.Log(id=60, stepid=51, name='stdio', slug='stdio',
-                           type='s', num_lines=len(log1)),
-                fakedb.Log(id=61, stepid=53, name='stdio', slug='stdio',
-                           type='s', num_lines=len(log2)),
-                fakedb.LogChunk(logid=60, first_line=0, last_line=4,
-                                compressed=0, content='\n'.join(log1)),
-                fakedb.LogChunk(logid=61, first_line=0, last_line=6,
-                                compressed=0, content='\n'.join(log2))
-            ])
+        if current in (SUCCESS, FAILURE):
+            name, slug, typ = 'stdio', 'stdio', 's'
         elif current == EXCEPTION:
-            self.db.insertTestData([
-                fakedb.Log(id=60, stepid=51, name='err.text', slug='err_text',
-                           type='t', num_lines=len(log1)),
-                fakedb.Log(id=61, stepid=53, name='err.text', slug='err_text',
-                           type='t', num_lines=len(log2)),
-                fakedb.LogChunk(logid=60, first_line=0, last_line=4,
-                                compressed=0, content='\n'.join(log1)),
-                fakedb.LogChunk(logid=61, first_line=0, last_line=6,
-                                compressed=0, content='\n'.join(log2))
-            ])
+            name, slug, typ = 'err.text', 'err_text', 't'
+        else:
+            return
+
+        self.db.insertTestData([
+            fakedb.Log(id=60, stepid=51, name=name, slug=slug, type=typ,
+                       num_lines=len(log1)),
+            fakedb.Log(id=61, stepid=53, name=name, slug=slug, type=typ,
+                       num_lines=len(log2)),
+            fakedb.LogChunk(logid=60, first_line=0, last_line=4,
+                            compressed=0, content='\n'.join(log1)),
+            fakedb.LogChunk(logid=61, first_line=0, last_line=6,
+                            compressed=0, content='\n'.join(log2))
+        ])
 
     def setupFormatter(self):
         return MarkdownFormatter()
 
     @ensure_deferred
     async def test_started(self):
-        expected = f"""
-        [Builder1 (#{self.BUILD_ID})]({self.BUILD_URL}) builder is started.
-
-        Revision: {self.REVISION}
-        """
         content = await self.render(previous=SUCCESS, current=-1,
                                     complete=False)
-        assert content == textwrap.dedent(expected).strip()
+        assert content == _EXPECTED_STATUS.format(
+            build_id=self.BUILD_ID,
+            build_url=self.BUILD_URL,
+            status='is started.',
+            revision=self.REVISION
+        )
 
     @ensure_deferred
     async def test_success(self):
-        status = 'has been succeeded.'
-        expected = f"""
-        [Builder1 (#{self.BUILD_ID})]({self.BUILD_URL}) builder {status}
-
-        Revision: {self.REVISION}
-        """
         log1 = ('hline1', 'hline2', 'oline3')
         log2 = ('hline1', 'oline2', 'oline3', 'hline7')
         content = await self.render(previous=SUCCESS, current=SUCCESS,
                                     log1=log1, log2=log2)
-        assert content == textwrap.dedent(expected).strip()
+        assert content == _EXPECTED_STATUS.format(
+            build_id=self.BUILD_ID,
+            build_url=self.BUILD_URL,
+            status='has been succeeded.',
+            revision=self.REVISION
+        )
 
     @ensure_deferred
     async def test_failure(self):
-        BUILD_URL = self.BUILD_URL
-        BUILD_ID = self.BUILD_ID
         log1 = ('hline1', 'hline2', 'oline3', 'eline4', 'eline5')
         log2 = ('hline1', 'eline2', 'eline3', 'oline4', 'eline5', 'eline6')
 
-        expected = f"""
-        [Builder1 (#{BUILD_ID})]({BUILD_URL}) builder failed.
-
-        Revision: {self.REVISION}
-
-        Benchmark: `/bin/run-benchmark` step's stderr:
-        ```
-        line4
-        line5
-        ```
-        """
         content = await self.render(buildsetid=99, previous=SUCCESS,
                                     current=FAILURE, log1=log1, log2=log2)
-        assert content == textwrap.dedent(expected).strip()
-
-        BUILD_URL = 'http://localhost:8080/#builders/80/builds/0'
-        BUILD_ID = 20
-        expected = f"""
-        [Builder1 (#{BUILD_ID})]({BUILD_URL}) builder failed.
-
-        Revision: {self.REVISION}
-
-        Benchmark: `/bin/run-benchmark` step's stderr:
-        ```
-        line2
-        line3
-        line5
-        line6
-        ```
-        """
+        assert content == _EXPECTED_STDERR.format(
+            build_id=self.BUILD_ID,
+            build_url=self.BUILD_URL,
+            revision=self.REVISION,
+            stderr='line4\nline5'
+        )
+
         content = await self.render(buildsetid=98, previous=SUCCESS,
                                     current=FAILURE, log1=log1, log2=log2)
-        assert content == textwrap.dedent(expected).strip()
+        assert content == _EXPECTED_STDERR.format(
+            build_id=20,
+            build_url='http://localhost:8080/#builders/80/builds/0',
+            revision=self.REVISION,
+            stderr='line2\nline3\nline5\nline6'
+        )
 
     @ensure_deferred
     async def test_exception(self):
-        try:
-            raise ValueError()
-        except Exception:
-            log1 = traceback.format_exc().strip()
-        try:
-            raise TypeError()
-        except Exception:
-            log2 = traceback.format_exc().strip()
-
-        status = 'failed with an exception.'
-        expected = f"""
-        [Builder1 (#{self.BUILD_ID})]({self.BUILD_URL}) builder {status}
-
-        Revision: {self.REVISION}
-
-        Benchmark: `/bin/run-benchmark` step's traceback:
-        ```pycon
-        {{log1}}
-        ```
-        """
+        log1, log2 = self.TRACEBACK1, self.TRACEBACK2
         content = await self.render(buildsetid=99, previous=SUCCESS,
                                     current=EXCEPTION, log1=log1.splitlines(),
                                     log2=log2.splitlines())
-        assert content == textwrap.dedent(expected).strip().format(log1=log1)
+        assert content == _EXPECTED_TRACEBACK.format(
+            build_id=self.BUILD_ID,
+            build_url=self.BUILD_URL,
+            revision=self.REVISION,
+            traceback=log1
+        )
+
+
+class TestThreadedMarkdownFormatter(TestMarkdownFormatter):
+
+    def setupFormatter(self):
+        return MarkdownFormatter(threaded=True)
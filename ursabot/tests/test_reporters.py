@@ -12,7 +12,8 @@ import pytest
 from twisted.trial import unittest
 from buildbot.config import ConfigErrors
 from buildbot.process.properties import Property, Interpolate, renderer
-from buildbot.process.results import SUCCESS, FAILURE, EXCEPTION, Results
+from buildbot.process.results import (Results, CANCELLED, EXCEPTION, FAILURE,
+                                      RETRY, SKIPPED, SUCCESS, WARNINGS)
 from buildbot.test.fake import fakemaster
 from buildbot.test.fake.httpclientservice import HTTPClientService
 from buildbot.test.util.misc import TestReactorMixin
@@ -20,7 +21,7 @@ from buildbot.test.util.reporter import ReporterTestMixin
 
 from ursabot.reporters import (HttpStatusPush, ZulipStatusPush,
                                GitHubStatusPush, GitHubReviewPush,
-                               GitHubCommentPush)
+                               GitHubCommentPush, _LazyProperties)
 from ursabot.formatters import Formatter
 from ursabot.builders import Builder
 from ursabot.utils import ensure_deferred
@@ -28,6 +29,26 @@ from ursabot.tests.mocks import GithubClientService
 from ursabot.workers import LocalWorker
 
 
+def test_lazy_properties():
+    props = _LazyProperties({
+        'branch': ('master', 'Build'),
+        'buildername': ('Builder0', 'Builder')
+    })
+    assert props['branch'] == 'master'
+    assert 'branch' in props
+    assert 'revision' not in props
+    assert props.getProperty('revision', 'HEAD') == 'HEAD'
+    with pytest.raises(KeyError):
+        props['revision']
+
+    # not materialized for plain lookups
+    assert props._properties is None
+
+    rendered = props.render(Interpolate('ursabot/%(prop:buildername)s'))
+    assert rendered.result == 'ursabot/Builder0'
+    assert props.getPropertySource('branch') == 'Build'
+
+
 class HttpReporterTestCase(TestReactorMixin, unittest.TestCase,
                            ReporterTestMixin):
     # License note:
@@ -163,6 +184,14 @@ class TestHttpStatusPush(HttpReporterTestCase):
             }
         )
 
+    def test_report_on_string(self):
+        with pytest.raises(ConfigErrors, match='not a string'):
+            HttpStatusPush(name='test', baseURL=self.BASEURL,
+                           report_on='failure')
+        with pytest.raises(ConfigErrors, match='not a string'):
+            HttpStatusPush(name='test', baseURL=self.BASEURL,
+                           dont_report_on='success')
+
     @ensure_deferred
     async def test_report_on_both_whitelist_and_blacklist(self):
         with pytest.raises(ConfigErrors):
@@ -244,8 +273,9 @@ class GithubReporterTestCase(HttpReporterTestCase):
             verify=None
         )
 
-    async def setupReporter(self):
-        reporter = self.Reporter(tokens=self.TOKENS, formatter=DumbFormatter())
+    async def setupReporter(self, **kwargs):
+        reporter = self.Reporter(tokens=self.TOKENS, formatter=DumbFormatter(),
+                                 **kwargs)
         await reporter.setServiceParent(self.master)
         return reporter
 
@@ -311,6 +341,113 @@ class TestGitHubStatusPush(GithubReporterTestCase):
         build['results'] = FAILURE
         reporter.buildFinished(('build', 20, 'finished'), build)
 
+    @ensure_deferred
+    async def test_invalid_project(self):
+        reporter = await self.setupReporter()
+        sourcestamp = {
+            'branch': 'master',
+            'project': 'buildbot/buildbot/extra',
+            'repository': 'https://github.com/buildbot/buildbot',
+            'revision': 'd34db33fd43db33f'
+        }
+        with pytest.raises(ValueError, match='<owner>/<name>'):
+            reporter._extract_github_params(sourcestamp)
+
+    @ensure_deferred
+    async def test_coalesce_delay(self):
+        reporter = await self.setupReporter(coalesce_delay=1)
+        build = await self.setupBuildResults(SUCCESS, complete=False)
+
+        reporter.buildStarted(('build', 20, 'started'), build)
+        build['complete'] = True
+        reporter.buildFinished(('build', 20, 'finished'), build)
+
+        # only the latest status is sent after the delay
+        self._http.expect(
+            'post',
+            '/repos/buildbot/buildbot/statuses/d34db33fd43db33f',
+            json={
+                'state': 'success',
+                'target_url': 'http://localhost:8080/#builders/79/builds/0',
+                'description': 'success',
+                'context': 'ursabot/Builder0'
+            }
+        )
+        self.reactor.advance(1)
+
+        build['results'] = FAILURE
+        reporter.buildFinished(('build', 20, 'finished'), build)
+        self._http.expect(
+            'post',
+            '/repos/buildbot/buildbot/statuses/d34db33fd43db33f',
+            json={
+                'state': 'failure',
+                'target_url': 'http://localhost:8080/#builders/79/builds/0',
+                'description': 'failure',
+                'context': 'ursabot/Builder0'
+            }
+        )
+        self.reactor.advance(1)
+
+    @ensure_deferred
+    async def test_coalesce_delay_reconfig(self):
+        reporter = await self.setupReporter(coalesce_delay=1)
+        build = await self.setupBuildResults(SUCCESS, complete=True)
+        reporter.buildFinished(('build', 20, 'finished'), build)
+
+        # the update pending before the reconfiguration is still sent
+        sibling = self.Reporter(tokens=self.TOKENS, formatter=DumbFormatter(),
+                                coalesce_delay=2)
+        await reporter.reconfigServiceWithSibling(sibling)
+        self._http.expect(
+            'post',
+            '/repos/buildbot/buildbot/statuses/d34db33fd43db33f',
+            json={
+                'state': 'success',
+                'target_url': 'http://localhost:8080/#builders/79/builds/0',
+                'description': 'success',
+                'context': 'ursabot/Builder0'
+            }
+        )
+        self.reactor.advance(1)
+        assert reporter._pending == {}
+
+        # stopping the service cancels the pending updates
+        reporter.buildFinished(('build', 20, 'finished'), build)
+        await reporter.disownServiceParent()
+        assert reporter._pending == {}
+        self.reactor.advance(2)
+
+    def test_coalesce_delay_validation(self):
+        with pytest.raises(ConfigErrors):
+            self.Reporter(tokens=self.TOKENS, coalesce_delay=-1)
+        with pytest.raises(ConfigErrors):
+            self.Reporter(tokens=self.TOKENS, coalesce_delay='1')
+
+
+@pytest.mark.parametrize(('result', 'state', 'event'), [
+    (SUCCESS, 'success', 'APPROVE'),
+    (WARNINGS, 'success', 'APPROVE'),
+    (FAILURE, 'failure', 'REQUEST_CHANGES'),
+    (SKIPPED, 'success', 'APPROVE'),
+    (EXCEPTION, 'error', 'REQUEST_CHANGES'),
+    (RETRY, 'pending', 'PENDING'),
+    (CANCELLED, 'error', 'REQUEST_CHANGES'),
+    (-1, 'error', 'REQUEST_CHANGES'),
+    (len(Results), 'error', 'REQUEST_CHANGES')
+])
+def test_github_states_and_review_events(result, state, event):
+    status_push = GitHubStatusPush(tokens=['xyz'])
+    review_push = GitHubReviewPush(tokens=['xyz'])
+
+    build = {'complete': True, 'results': result}
+    assert status_push._state_for(build) == state
+    assert review_push._event_for(build) == event
+
+    build = {'complete': False, 'results': result}
+    assert status_push._state_for(build) == 'pending'
+    assert review_push._event_for(build) == 'PENDING'
+
 
 class TestGitHubCommentPush(GithubReporterTestCase):
     # License note:
@@ -0,0 +1,171 @@
+# Copyright 2019 RStudio, Inc.
+# All rights reserved.
+#
+# Use of this source code is governed by a BSD 2-Clause
+# license that can be found in the LICENSE_BSD file.
+
+import shutil
+import tempfile
+import types
+from pathlib import Path
+
+from twisted.internet import defer, threads, utils
+from twisted.trial import unittest
+from buildbot.test.fake import fakemaster
+from buildbot.test.util.misc import TestReactorMixin
+
+from ursabot import secrets
+from ursabot.secrets import SecretInPass
+from ursabot.utils import ensure_deferred
+
+
+class TestSecretInPass(TestReactorMixin, unittest.TestCase):
+
+    def setUp(self):
+        self.setUpTestReactor()
+        self.master = fakemaster.make_master(self)
+        self.patch(SecretInPass, 'checkPassIsInPath', lambda self: None)
+
+        self.calls = []
+        self.pending = {}
+        self.secrets = {
+            'github/token': 'secret',
+            'zulip/apikey': 'apikey'
+        }
+
+        def getProcessOutput(executable, args=(), env=None):
+            self.calls.append((executable, list(args)))
+            if executable == 'pass':
+                entry, = args
+                if entry in self.pending:
+                    return self.pending[entry]
+                elif entry in self.secrets:
+                    output = f'{self.secrets[entry]}\nlogin: ursabot\n'
+                    return defer.succeed(output.encode())
+                else:
+                    return defer.fail(IOError(f'{entry} is not in the store'))
+            else:
+                # batched lookup through sh -c script sh entries...
+                lines = []
+                for entry in args[3:]:
+                    if entry in self.secrets:
+                        lines.append(f'+{self.secrets[entry]}\n')
+                    else:
+                        lines.append('-\n')
+                return defer.succeed(''.join(lines).encode())
+
+        self.patch(utils, 'getProcessOutput', getProcessOutput)
+
+    def setupProvider(self, **kwargs):
+        provider = SecretInPass(**kwargs)
+        provider.setServiceParent(self.master)
+        provider.reconfigService(**kwargs)
+        return provider
+
+    def get(self, provider, *entries):
+        # lookups are resolved in the next reactor iteration
+        results = [provider.get(entry) for entry in entries]
+        self.reactor.advance(0)
+        return defer.gatherResults(results)
+
+    @ensure_deferred
+    async def test_get(self):
+        provider = self.setupProvider()
+        assert await self.get(provider, 'github/token') == ['secret']
+        assert await self.get(provider, 'zulip/apikey') == ['apikey']
+        assert await self.get(provider, 'missing') == [None]
+        assert [executable for executable, _ in self.calls] == ['pass'] * 3
+
+    @ensure_deferred
+    async def test_get_is_cached(self):
+        provider = self.setupProvider()
+        for _ in range(3):
+            assert await self.get(provider, 'github/token') == ['secret']
+        assert len(self.calls) == 1
+
+        # failures are not cached
+        for _ in range(2):
+            assert await self.get(provider, 'missing') == [None]
+        assert len(self.calls) == 3
+
+    @ensure_deferred
+    async def test_cache_can_be_disabled(self):
+        provider = self.setupProvider(cache_ttl=0)
+        for _ in range(3):
+            assert await self.get(provider, 'github/token') == ['secret']
+        assert len(self.calls) == 3
+
+    @ensure_deferred
+    async def test_concurrent_gets_are_coalesced(self):
+        provider = self.setupProvider()
+        self.pending['github/token'] = pending = defer.Deferred()
+
+        results = self.get(provider, *['github/token'] * 3)
+        assert len(self.calls) == 1
+
+        pending.callback(b'secret\n')
+        assert await results == ['secret'] * 3
+        assert len(self.calls) == 1
+
+    @ensure_deferred
+    async def test_reconfig_while_lookups_are_coalesced(self):
+        provider = self.setupProvider()
+        self.pending['github/token'] = pending = defer.Deferred()
+
+        results = self.get(provider, *['github/token'] * 3)
+        provider.reconfigService(cache_ttl=30)
+
+        pending.callback(b'secret\n')
+        assert await results == ['secret'] * 3
+        assert len(self.calls) == 1
+
+    @ensure_deferred
+    async def test_reconfig_before_the_batch_is_flushed(self):
+        provider = self.setupProvider()
+        results = [provider.get(entry)
+                   for entry in ('github/token', 'zulip/apikey')]
+        provider.reconfigService(cache_ttl=30)
+
+        self.reactor.advance(0)
+        assert await defer.gatherResults(results) == ['secret', 'apikey']
+        assert len(self.calls) == 1
+
+    @ensure_deferred
+    async def test_gets_are_batched(self):
+        provider = self.setupProvider()
+        values = await self.get(provider, 'github/token', 'missing',
+                                'zulip/apikey', 'github/token')
+        assert values == ['secret', None, 'apikey', 'secret']
+
+        (executable, args), = self.calls
+        assert executable == 'sh'
+        assert args[3:] == ['github/token', 'missing', 'zulip/apikey']
+
+    @ensure_deferred
+    async def test_gpgme_decrypts_the_batch_with_one_context(self):
+        contexts = []
+
+        class Context:
+            def __enter__(self):
+                contexts.append(self)
+                return self
+
+            def __exit__(self, *exc_info):
+                pass
+
+            def decrypt(self, fp, passphrase=None, verify=True):
+                return fp.read(), None, None
+
+        self.patch(secrets, 'gpg', types.SimpleNamespace(Context=Context))
+        self.patch(threads, 'deferToThread', defer.maybeDeferred)
+
+        store = Path(tempfile.mkdtemp())
+        self.addCleanup(shutil.rmtree, store)
+        (store / 'github').mkdir(parents=True)
+        (store / 'github' / 'token.gpg').write_bytes(b'secret\nlogin: x\n')
+
+        provider = self.setupProvider(dirname=store, gpgme=True)
+        values = await self.get(provider, 'github/token', 'missing')
+        assert values == ['secret', None]
+        assert len(contexts) == 1
+        assert self.calls == []
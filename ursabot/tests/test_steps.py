@@ -10,6 +10,7 @@
 
 import pytest
 from pathlib import Path
+from concurrent.futures import Future
 
 from twisted.trial import unittest
 from buildbot.plugins import util
@@ -21,8 +22,10 @@ from buildbot.test.util.misc import TestReactorMixin
 from buildbot.test.fake.remotecommand import (ExpectShell, Expect,
                                               ExpectRemoteRef)
 
+import ursabot.steps
 from ursabot.steps import (ShellCommand, ResultLogMixin, SetPropertiesFromEnv,
-                           SetPropertyFromCommand)
+                           SetPropertyFromCommand, BatchedShellCommand,
+                           CMake, PythonFunction)
 from ursabot.utils import ensure_deferred
 
 
@@ -73,18 +76,24 @@ class TestShellCommand(BuildStepTestCase):
             ShellCommand()
 
         cmd = ShellCommand(command='something')
-        assert cmd.command == util.FlattenList(['something'])
+        assert cmd.command == ['something']
 
         cmd = ShellCommand(command='something', args=['arg1', 'arg2'])
-        assert cmd.command == util.FlattenList(['something', ['arg1', 'arg2']])
+        assert cmd.command == ['something', 'arg1', 'arg2']
 
         cmd = ShellCommand(command=['echo', '1'])
-        assert cmd.command == util.FlattenList([('echo', '1')])
+        assert cmd.command == ['echo', '1']
+
+        cmd = ShellCommand(command=['echo', '1'], as_shell=True)
+        assert cmd.command == 'echo 1'
 
         cmd = MyDockerCommand(args=['--help'])
-        assert cmd.command == util.FlattenList([
-            ['my-docker-binary'], ['--help']
-        ])
+        assert cmd.command == ['my-docker-binary', '--help']
+
+        # commands containing renderables are flattened during the build
+        prop = util.Property('prop')
+        cmd = ShellCommand(command='echo', args=[prop])
+        assert cmd.command == util.FlattenList(['echo', [prop]])
 
     @ensure_deferred
     async def test_echo(self):
@@ -112,6 +121,96 @@ class TestShellCommand(BuildStepTestCase):
         return await self.runStep()
 
 
+class TestBatchedShellCommand(BuildStepTestCase):
+
+    def test_constructor(self):
+        with pytest.raises(ValueError, match='No steps were provided'):
+            BatchedShellCommand([])
+        with pytest.raises(ValueError, match='sets environment variables'):
+            BatchedShellCommand([
+                ShellCommand(command='make', env={'CC': 'clang'})
+            ])
+        with pytest.raises(ValueError, match='no command defined'):
+            BatchedShellCommand([CMake(path='..')])
+
+    @ensure_deferred
+    async def test_script(self):
+        self.setupStep(
+            BatchedShellCommand([
+                ShellCommand(command=['mkdir', '-p', 'cpp/build']),
+                ShellCommand(command='cmake', args=['..', '-GNinja'],
+                             workdir='cpp/build'),
+                ShellCommand(command='ninja', args=[util.Property('target')],
+                             workdir='cpp/build'),
+                ShellCommand(command='ls *.whl', as_shell=True)
+            ], workdir='build')
+        )
+        self.properties.setProperty('target', 'install', 'test')
+        script = '\n'.join([
+            'set -e',
+            'mkdir -p cpp/build',
+            '(cd cpp/build && cmake .. -GNinja)',
+            '(cd cpp/build && ninja install)',
+            'ls *.whl'
+        ])
+        self.expectCommands(
+            ExpectShell(workdir='build', command=['/bin/sh', '-c', script]) +
+            0
+        )
+        self.expectOutcome(result=SUCCESS)
+        return await self.runStep()
+
+
+class TestCMake(BuildStepTestCase):
+
+    @ensure_deferred
+    async def test_definitions(self):
+        self.setupStep(
+            CMake(path='..', generator='Ninja', workdir='build', definitions={
+                'STATIC': 'ON',
+                'MISSING': None,
+                'RENDERED': util.Property('rendered'),
+                'RENDERED_MISSING': util.Property('missing')
+            })
+        )
+        self.properties.setProperty('rendered', 'OFF', 'test')
+        self.expectCommands(
+            ExpectShell(workdir='build', command=[
+                'cmake', '-G', 'Ninja', '..', '-DSTATIC=ON', '-DRENDERED=OFF'
+            ]) +
+            0
+        )
+        self.expectOutcome(result=SUCCESS)
+        return await self.runStep()
+
+
+class TestPythonFunction(BuildStepTestCase):
+
+    @ensure_deferred
+    async def test_non_blocking(self):
+        self.setupStep(PythonFunction(lambda: 'result', blocking=False))
+        self.expectLogfile('result', 'result')
+        self.expectOutcome(result=SUCCESS)
+        return await self.runStep()
+
+    @pytest.mark.skipif(ursabot.steps.cloudpickle is None,
+                        reason='cloudpickle is not installed')
+    @ensure_deferred
+    async def test_process_pool(self):
+        class Executor:
+            # executes the submitted functions synchronously
+            def submit(self, fn, *args):
+                future = Future()
+                future.set_result(fn(*args))
+                return future
+
+        self.patch(ursabot.steps, '_process_pool', Executor())
+        self.setupStep(PythonFunction(lambda: 'result', process_pool=True))
+        self.expectLogfile('result', 'result')
+        self.expectOutcome(result=SUCCESS)
+        return await self.runStep()
+
+
 class TestSetPropertiesFromEnv(BuildStepTestCase):
 
     def test_simple(self):
@@ -147,6 +246,17 @@ class TestSetPropertiesFromEnv(BuildStepTestCase):
         self.expectProperty('six', '6', source='me')
         return self.runStep()
 
+    def test_windows(self):
+        self.setupStep(
+            SetPropertiesFromEnv({'one': 'one', 'two': 'Two'}, source='me')
+        )
+        self.worker.worker_environ = {'ONE': '1', 'TWO': '2', 'one': 'x'}
+        self.worker.worker_system = 'win32'
+        self.expectOutcome(result=SUCCESS, state_string='Set')
+        self.expectProperty('one', '1', source='me')
+        self.expectProperty('two', '2', source='me')
+        return self.runStep()
+
 
 class TestSetPropertyFromCommand(BuildStepTestCase):
 
@@ -101,6 +101,24 @@ class GithubClientServiceTest(unittest.TestCase):
         finally:
             assert failures == []
 
+    @ensure_deferred
+    async def test_service_is_shared(self):
+        headers = {'User-Agent': 'Ursabot'}
+        kwargs = dict(tokens=['A', 'B', 'C'], headers=headers)
+
+        http = await GithubClientService.getService(
+            self.parent, 'https://api.github.com', **kwargs
+        )
+        # the token must not leak into the passed headers, otherwise the
+        # shared service's key changes on reconfiguration
+        assert headers == {'User-Agent': 'Ursabot'}
+        assert http._headers['Authorization'] == 'token A'
+
+        again = await GithubClientService.getService(
+            self.parent, 'https://api.github.com', **kwargs
+        )
+        assert again is http
+
     @ensure_deferred
     async def test_fetching_rate_limit(self):
         from treq.testing import HasHeaders
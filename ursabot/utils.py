@@ -4,6 +4,7 @@
 # Use of this source code is governed by a BSD 2-Clause
 # license that can be found in the LICENSE_BSD file.
 
+import re
 import copy
 import platform
 import pathlib
@@ -197,15 +198,23 @@ def InstanceOf(cls):
     return lambda value: isinstance(value, cls)
 
 
+def _compile_glob(pattern):
+    # translate the shell pattern to a regex once instead of looking it up
+    # in fnmatch's cache on each call
+    return re.compile(fnmatch.translate(pattern)).match
+
+
 def Matching(pattern):
     if pattern is None:
         return lambda v: v is None
     else:
-        return lambda v: fnmatch.fnmatch(str(v), pattern)
+        match = _compile_glob(pattern)
+        return lambda v: match(str(v)) is not None
 
 
 def Glob(pattern):
-    return lambda vs: fnmatch.filter(vs, pattern)
+    match = _compile_glob(pattern)
+    return lambda vs: [v for v in vs if match(v)]
 
 
 def AnyOf(*validators):
@@ -404,7 +413,11 @@ class GithubClientService(HTTPClientService):
         self._n_tokens = len(tokens)
         self._rotate_at = rotate_at
         self._max_retries = max_retries
-        headers = headers or {}
+        # copy the headers, because the token is set on them later and
+        # mutating the caller's dictionary would change the key of the shared
+        # service, so reconfiguration would spawn new clients instead of
+        # reusing the existing one
+        headers = dict(headers or {})
         headers.setdefault('User-Agent', 'Buildbot')
         super().__init__(*args, headers=headers, **kwargs)
 